@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from typing import NamedTuple, Union
+
+import numpy as np
+
+from lobster_common.constants import *
+from lobster_common.exceptions import InputDimensionError
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+_EPS = np.finfo(float).eps * 4.0
+
+
+def _check_shape(array: np.ndarray, width: int, name: str):
+    if array.ndim != 2 or array.shape[1] != width:
+        raise InputDimensionError(f"{name} needs an input array of shape (N, {width}), not {array.shape}")
+
+
+def _as_rows(data: Union[np.ndarray, Vec3, Quaternion], width: int, name: str) -> np.ndarray:
+    """
+    Gives an (N, width) float array, a single Vec3, Quaternion or one dimensional array becomes a single row.
+    """
+    if isinstance(data, (Vec3, Quaternion)):
+        data = data.numpy()
+
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data[np.newaxis, :]
+
+    _check_shape(data, width, name)
+    return data
+
+
+def _check_rows(a: np.ndarray, b: np.ndarray, name: str):
+    if a.shape[0] != b.shape[0] and a.shape[0] != 1 and b.shape[0] != 1:
+        raise InputDimensionError(f"{name} needs inputs with the same number of rows or a single row, "
+                                  f"not {a.shape[0]} and {b.shape[0]}")
+
+
+def _normalized_quaternions(quaternions: np.ndarray, name: str) -> np.ndarray:
+    norms = np.linalg.norm(quaternions, axis=1)
+    zero_rows = np.flatnonzero(norms == 0.0)
+    if zero_rows.shape[0] > 0:
+        raise ZeroDivisionError(f"Input {name} has zero norm quaternions at rows {zero_rows[:10].tolist()}"
+                                f"{' and more' if zero_rows.shape[0] > 10 else ''}")
+
+    return quaternions / norms[:, np.newaxis]
+
+
+def rotate_vectors(vectors: np.ndarray, quaternion: Quaternion, inverse: bool = False) -> np.ndarray:
+    """
+    Rotates every row of an (N, 3) array by the same quaternion, equivalent to calling Vec3.rotate per row.
+    :param vectors: Array of shape (N, 3)
+    :param quaternion: Unit quaternion of the rotation
+    :param inverse: Rotate inversely, equivalent to Vec3.rotate_inverse
+    :return: Rotated vectors as an array of shape (N, 3)
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    _check_shape(vectors, 3, "rotate_vectors")
+
+    matrix = quaternion.get_rotation_matrix()
+
+    # Row vectors, so v' = R v becomes v'^T = v^T R^T
+    return vectors @ (matrix if inverse else matrix.T)
+
+
+def convert_ned_nwu(data: np.ndarray) -> np.ndarray:
+    """
+    Converts an (N, 3) array of vectors or an (N, 4) array of quaternions between the NED and NWU coordinate systems.
+    The conversion is its own inverse, so it works in both directions.
+    :param data: Array of shape (N, 3) or (N, 4)
+    :return: Converted array with the same shape
+    """
+    data = np.array(data, dtype=np.float64)
+    if data.ndim != 2 or data.shape[1] not in (3, 4):
+        raise InputDimensionError(f"convert_ned_nwu needs an input array of shape (N, 3) or (N, 4), not {data.shape}")
+
+    # Negating Y and Z
+    data[:, Y] = -data[:, Y]
+    data[:, Z] = -data[:, Z]
+    return data
+
+
+def quaternions_to_euler(quaternions: np.ndarray) -> np.ndarray:
+    """
+    Converts an (N, 4) array of quaternions to euler angles, equivalent to calling Quaternion.to_euler per row.
+    :param quaternions: Array of shape (N, 4) in the form [x, y, z, w]
+    :return: Euler angles as an array of shape (N, 3)
+    """
+    q = np.asarray(quaternions, dtype=np.float64)
+    _check_shape(q, 4, "quaternions_to_euler")
+
+    # Same rotation matrix elements as transformations.quaternion_matrix, which treats tiny quaternions as identity
+    nq = np.einsum("ij,ij->i", q, q)
+    scale = np.where(nq < _EPS, 0.0, np.sqrt(2.0 / np.where(nq < _EPS, 1.0, nq)))
+    x, y, z, w = (q * scale[:, np.newaxis]).T
+
+    m00 = 1.0 - y * y - z * z
+    m10 = x * y + z * w
+    m11 = 1.0 - x * x - z * z
+    m12 = y * z - x * w
+    m20 = x * z - y * w
+    m21 = y * z + x * w
+    m22 = 1.0 - x * x - y * y
+
+    # Same as transformations.euler_from_matrix for the 'sxyz' axes, including the gimbal lock case
+    cy = np.sqrt(m00 * m00 + m10 * m10)
+    regular = cy > _EPS
+
+    euler = np.empty((q.shape[0], 3), dtype=np.float64)
+    euler[:, X] = np.where(regular, np.arctan2(m21, m22), np.arctan2(-m12, m11))
+    euler[:, Y] = np.arctan2(-m20, cy)
+    euler[:, Z] = np.where(regular, np.arctan2(m10, m00), 0.0)
+    return euler
+
+
+def euler_to_quaternions(euler_angles: np.ndarray) -> np.ndarray:
+    """
+    Converts an (N, 3) array of euler angles to quaternions, equivalent to calling Quaternion.from_euler per row.
+    :param euler_angles: Array of shape (N, 3)
+    :return: Normalized quaternions as an array of shape (N, 4) in the form [x, y, z, w]
+    """
+    euler_angles = np.asarray(euler_angles, dtype=np.float64)
+    _check_shape(euler_angles, 3, "euler_to_quaternions")
+
+    half = euler_angles / 2
+    ca, cb, cg = np.cos(half).T
+    sa, sb, sg = np.sin(half).T
+
+    R = np.empty((euler_angles.shape[0], 4), dtype=np.float64)
+    R[:, X] = sa * cb * cg - ca * sb * sg
+    R[:, Y] = ca * sb * cg + sa * cb * sg
+    R[:, Z] = ca * cb * sg - sa * sb * cg
+    R[:, W] = ca * cb * cg + sa * sb * sg
+
+    return R / np.linalg.norm(R, axis=1)[:, np.newaxis]
+
+
+def resample(times: np.ndarray, values: np.ndarray, target_times: np.ndarray, quaternion: bool = False) -> np.ndarray:
+    """
+    Interpolates samples at the given target times. Target times outside the sampled range are clamped to the first or
+    last sample.
+    :param times: Non-decreasing sample times in nanoseconds with shape (N,)
+    :param values: Samples with shape (N, M)
+    :param target_times: Times in nanoseconds to interpolate at with shape (K,)
+    :param quaternion: Treat the samples as quaternions and interpolate along the shortest path (normalized lerp)
+    :return: Interpolated samples with shape (K, M)
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    target_times = np.asarray(target_times, dtype=np.int64)
+
+    if values.ndim != 2 or times.shape != (values.shape[0],):
+        raise InputDimensionError(f"resample needs times of shape (N,) and values of shape (N, M), "
+                                  f"not {times.shape} and {values.shape}")
+    if quaternion and values.shape[1] != 4:
+        raise InputDimensionError(f"resample of quaternions needs values of shape (N, 4), not {values.shape}")
+    if values.shape[0] == 0:
+        raise ValueError("resample needs at least one sample")
+    if np.any(np.diff(times) < 0):
+        raise ValueError("resample needs non-decreasing sample times")
+
+    if values.shape[0] == 1:
+        return np.repeat(values, target_times.shape[0], axis=0)
+
+    index = np.clip(np.searchsorted(times, target_times, side="right") - 1, 0, times.shape[0] - 2)
+
+    # Differences are taken in integer nanoseconds first to keep the precision of large timestamps
+    dt = times[index + 1] - times[index]
+    fraction = np.where(dt > 0, (target_times - times[index]) / np.where(dt > 0, dt, 1), 0.0)
+    fraction = np.clip(fraction, 0.0, 1.0)[:, np.newaxis]
+
+    start = values[index]
+    end = values[index + 1]
+
+    if not quaternion:
+        return start + fraction * (end - start)
+
+    # q and -q describe the same rotation, so flip the end to take the shortest path
+    end = np.where(np.einsum("ij,ij->i", start, end)[:, np.newaxis] < 0, -end, end)
+    result = start + fraction * (end - start)
+    return result / np.linalg.norm(result, axis=1)[:, np.newaxis]
+
+
+class ComparisonReport(NamedTuple):
+    """
+    Result of a row-wise comparison.
+    """
+    mask: np.ndarray  # Per row whether it is within the tolerance
+    errors: np.ndarray  # Per row error
+    max_error: float
+    max_error_index: int  # Row with the largest error, -1 when there are no rows
+
+    @property
+    def all_close(self) -> bool:
+        return bool(self.mask.all())
+
+
+def _report(errors: np.ndarray, tolerance: float) -> ComparisonReport:
+    if errors.shape[0] == 0:
+        return ComparisonReport(np.ones(0, dtype=bool), errors, 0.0, -1)
+
+    index = int(np.argmax(errors))
+    return ComparisonReport(errors <= tolerance, errors, float(errors[index]), index)
+
+
+def compare_vectors(a: Union[np.ndarray, Vec3], b: Union[np.ndarray, Vec3],
+                    tolerance: float = 1e-8) -> ComparisonReport:
+    """
+    Compares vectors row by row, the error of a row is the euclidean distance between the vectors.
+    A single vector is compared against every row of the other input.
+    :param a: Array of shape (N, 3) or a single Vec3
+    :param b: Array of shape (N, 3) or a single Vec3
+    :param tolerance: Largest distance at which two vectors are considered equal
+    """
+    a = _as_rows(a, 3, "compare_vectors")
+    b = _as_rows(b, 3, "compare_vectors")
+    _check_rows(a, b, "compare_vectors")
+
+    return _report(np.linalg.norm(a - b, axis=1), tolerance)
+
+
+def quaternion_angles(a: Union[np.ndarray, Quaternion], b: Union[np.ndarray, Quaternion]) -> np.ndarray:
+    """
+    Gives the angle of the rotation between two sets of quaternions row by row. Since q and -q describe the same
+    rotation, the sign of the quaternions does not matter.
+    :param a: Array of shape (N, 4) or a single Quaternion
+    :param b: Array of shape (N, 4) or a single Quaternion
+    :return: Angles in radians in the range [0, pi] with shape (N,)
+    """
+    a = _as_rows(a, 4, "quaternion_angles")
+    b = _as_rows(b, 4, "quaternion_angles")
+    _check_rows(a, b, "quaternion_angles")
+    a = _normalized_quaternions(a, "a")
+    b = _normalized_quaternions(b, "b")
+
+    a, b = np.broadcast_arrays(a, b)
+    b = np.where(np.einsum("ij,ij->i", a, b)[:, np.newaxis] < 0, -b, b)
+
+    # Half the angle between the unit 4D vectors is atan2(|a - b|, |a + b|), which stays accurate for tiny angles
+    # unlike arccos of the dot product. The rotation angle is twice the angle between the 4D vectors.
+    return 4 * np.arctan2(np.linalg.norm(a - b, axis=1), np.linalg.norm(a + b, axis=1))
+
+
+def compare_quaternions(a: Union[np.ndarray, Quaternion], b: Union[np.ndarray, Quaternion],
+                        angle_tolerance: float = 1e-6) -> ComparisonReport:
+    """
+    Compares rotations row by row, the error of a row is the angle of the rotation between the quaternions.
+    Unlike Quaternion.almost_equal, q and -q are considered equal.
+    :param a: Array of shape (N, 4) or a single Quaternion
+    :param b: Array of shape (N, 4) or a single Quaternion
+    :param angle_tolerance: Largest angle in radians at which two rotations are considered equal
+    """
+    return _report(quaternion_angles(a, b), angle_tolerance)
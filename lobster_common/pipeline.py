@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from lobster_common import batch
+from lobster_common.exceptions import InputDimensionError
+from lobster_common.quaternion import Quaternion
+
+ArrayOrPath = Union[np.ndarray, str, os.PathLike]
+
+
+class Stage(ABC):
+    """
+    Base class of the row-wise stages of a Pipeline. A stage maps an (N, M) float array to an (N, K) float array.
+    """
+
+    @abstractmethod
+    def output_width(self, input_width: int) -> int:
+        """
+        Gives the number of output columns for the given number of input columns.
+        Raises an InputDimensionError when the stage does not accept that number of input columns.
+        """
+
+    @abstractmethod
+    def apply(self, data: np.ndarray) -> np.ndarray:
+        pass
+
+
+class Rotate(Stage):
+    """
+    Rotates (N, 3) vectors by a fixed quaternion, equivalent to Vec3.rotate or Vec3.rotate_inverse.
+    """
+
+    def __init__(self, quaternion: Quaternion, inverse: bool = False):
+        self.quaternion = Quaternion(np.asarray(quaternion.numpy(), dtype=np.float64))
+        self.inverse = inverse
+
+    def output_width(self, input_width: int) -> int:
+        if input_width != 3:
+            raise InputDimensionError(f"Rotate needs an input width of 3, not {input_width}")
+        return 3
+
+    def apply(self, data: np.ndarray) -> np.ndarray:
+        return batch.rotate_vectors(data, self.quaternion, self.inverse)
+
+
+class ConvertNedNwu(Stage):
+    """
+    Converts (N, 3) vectors or (N, 4) quaternions between the NED and NWU coordinate systems, in either direction.
+    """
+
+    def output_width(self, input_width: int) -> int:
+        if input_width not in (3, 4):
+            raise InputDimensionError(f"ConvertNedNwu needs an input width of 3 or 4, not {input_width}")
+        return input_width
+
+    def apply(self, data: np.ndarray) -> np.ndarray:
+        return batch.convert_ned_nwu(data)
+
+
+class QuaternionToEuler(Stage):
+    """
+    Converts (N, 4) quaternions to (N, 3) euler angles, equivalent to Quaternion.to_euler.
+    """
+
+    def output_width(self, input_width: int) -> int:
+        if input_width != 4:
+            raise InputDimensionError(f"QuaternionToEuler needs an input width of 4, not {input_width}")
+        return 3
+
+    def apply(self, data: np.ndarray) -> np.ndarray:
+        return batch.quaternions_to_euler(data)
+
+
+class EulerToQuaternion(Stage):
+    """
+    Converts (N, 3) euler angles to (N, 4) quaternions, equivalent to Quaternion.from_euler.
+    """
+
+    def output_width(self, input_width: int) -> int:
+        if input_width != 3:
+            raise InputDimensionError(f"EulerToQuaternion needs an input width of 3, not {input_width}")
+        return 4
+
+    def apply(self, data: np.ndarray) -> np.ndarray:
+        return batch.euler_to_quaternions(data)
+
+
+class Resample:
+    """
+    Re-times the samples onto a regular grid that starts at the first sample time. Needs sample times to be passed to
+    Pipeline.run and can occur at most once in a pipeline.
+    This is deliberately not a Stage, since it changes the number of rows and needs the sample times. The Pipeline
+    splits its stages around it instead.
+    """
+
+    def __init__(self, period: int, quaternion: bool = False):
+        """
+        :param period: Time between the output samples in nanoseconds, e.g. Milliseconds(10)
+        :param quaternion: Interpolate the samples as quaternions instead of linearly per column
+        """
+        if int(period) <= 0:
+            raise ValueError(f"Resample period has to be positive, not {period}")
+
+        self.period = int(period)
+        self.quaternion = quaternion
+
+
+def _apply_stages(stages: Sequence[Stage], data: np.ndarray) -> np.ndarray:
+    for stage in stages:
+        data = stage.apply(data)
+    return data
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+# State of a worker process, filled by _init_worker
+_worker_state: dict = {}
+
+
+def _process_chunk(state: dict, slot: int, n_in: int, first_target: int, n_out: int):
+    values = state["in"][slot][:n_in]
+    data = _apply_stages(state["pre"], values)
+
+    resample = state["resample"]
+    if resample is not None:
+        grid = np.arange(first_target, first_target + n_out, dtype=np.int64)
+        target_times = state["start_time"] + grid * resample.period
+        data = batch.resample(state["times"][slot][:n_in], data, target_times, resample.quaternion)
+        data = _apply_stages(state["post"], data)
+
+    state["out"][slot][:n_out] = data
+
+
+def _init_worker(pre, resample, post, start_time, in_names, times_names, out_names, in_shape, out_shape):
+    def attach(name, shape, dtype):
+        memory = shared_memory.SharedMemory(name=name)
+        # Keep a reference, the array view is invalid once the shared memory object is garbage collected
+        _worker_state.setdefault("memory", []).append(memory)
+        return np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+    _worker_state.update(pre=pre, resample=resample, post=post, start_time=start_time)
+    _worker_state["in"] = [attach(name, in_shape, np.float64) for name in in_names]
+    _worker_state["times"] = [attach(name, in_shape[:1], np.int64) for name in times_names]
+    _worker_state["out"] = [attach(name, out_shape, np.float64) for name in out_names]
+
+
+def _run_chunk(slot: int, n_in: int, first_target: int, n_out: int):
+    _process_chunk(_worker_state, slot, n_in, first_target, n_out)
+
+
+def _open_input(data: Optional[ArrayOrPath]) -> Optional[np.ndarray]:
+    if data is None or isinstance(data, np.ndarray):
+        return data
+    return np.load(data, mmap_mode="r")
+
+
+class Pipeline:
+    """
+    Streams large arrays of vectors, quaternions or euler angles in chunks through a chain of stages.
+    The chunks are processed by a pool of worker processes that exchange the data through shared memory. At most
+    max_chunks_in_flight chunks are in memory at once and the output is always written in the input order.
+    """
+
+    def __init__(self, stages: List[Union[Stage, Resample]], chunk_size: int = 1_000_000,
+                 processes: Optional[int] = None, max_chunks_in_flight: Optional[int] = None):
+        """
+        :param stages: Stages that are applied to every chunk in the given order. Besides row-wise Stage instances the
+                       list can contain a single Resample, which is not a Stage. The stages before it are applied to
+                       the samples, the stages after it to the resampled rows.
+        :param chunk_size: Number of input rows per chunk, and the maximum number of output rows per chunk
+        :param processes: Number of worker processes, defaults to the number of CPUs. 0 processes every chunk in the
+                          calling process, which avoids the pool overhead for small inputs.
+        :param max_chunks_in_flight: Number of chunk buffers, defaults to twice the number of processes
+        """
+        resample_indices = [i for i, stage in enumerate(stages) if isinstance(stage, Resample)]
+        if len(resample_indices) > 1:
+            raise ValueError("A pipeline can contain at most one Resample stage")
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size has to be positive, not {chunk_size}")
+
+        if resample_indices:
+            index = resample_indices[0]
+            self._pre, self._resample, self._post = list(stages[:index]), stages[index], list(stages[index + 1:])
+        else:
+            self._pre, self._resample, self._post = list(stages), None, []
+
+        self.chunk_size = chunk_size
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.max_chunks_in_flight = max_chunks_in_flight or max(2 * self.processes, 1)
+
+    def _output_width(self, input_width: int) -> int:
+        for stage in self._pre + self._post:
+            input_width = stage.output_width(input_width)
+        return input_width
+
+    def _check_times(self, times: np.ndarray):
+        """
+        Checks that the sample times never decrease. The check runs per chunk, so memory-mapped times are not loaded
+        at once.
+        """
+        for start in range(0, times.shape[0], self.chunk_size):
+            # One overlapping row to also check the step between two chunks
+            if np.any(np.diff(times[start:start + self.chunk_size + 1]) < 0):
+                raise ValueError("resample needs non-decreasing sample times")
+
+    def _plan(self, times: Optional[np.ndarray], n_rows: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Splits the input into chunks of at most chunk_size input rows (plus one overlapping row when resampling) and
+        at most chunk_size output rows. When resampling, chunks without any grid points are left out.
+        :return: List of (first input row, number of input rows, first output row, number of output rows)
+        """
+        starts = list(range(0, n_rows, self.chunk_size))
+
+        if self._resample is None:
+            return [(start, min(self.chunk_size, n_rows - start), start, min(self.chunk_size, n_rows - start))
+                    for start in starts]
+
+        # Every chunk produces the grid points from its first sample time up to the first sample time of the next
+        # chunk, so it also needs that next sample to interpolate.
+        period = self._resample.period
+        start_time = int(times[0])
+        grid_bounds = [_ceil_div(int(times[start]) - start_time, period) for start in starts]
+        grid_bounds.append((int(times[n_rows - 1]) - start_time) // period + 1)
+
+        # Upsampling or gaps in the sample times can give a chunk far more grid points than samples. Those chunks are
+        # split into several tasks of at most chunk_size grid points, which bounds the size of the output buffers.
+        # Every task only gets the input rows that bracket its grid points.
+        plan = []
+        for i, start in enumerate(starts):
+            n_in = min(self.chunk_size + 1, n_rows - start)
+            chunk_times = np.asarray(times[start:start + n_in])
+
+            for first in range(grid_bounds[i], grid_bounds[i + 1], self.chunk_size):
+                count = min(self.chunk_size, grid_bounds[i + 1] - first)
+                first_time = start_time + first * period
+                last_time = start_time + (first + count - 1) * period
+
+                # Same bracketing rows as batch.resample uses: the last sample at or before the first grid point and
+                # the first sample after the last grid point
+                end = min(int(np.searchsorted(chunk_times, last_time, side="right")) + 1, n_in)
+                begin = max(int(np.searchsorted(chunk_times, first_time, side="right")) - 1, 0)
+                # Keep at least two rows, so the interpolation is the same as over the whole chunk
+                begin = min(begin, max(end - 2, 0))
+
+                plan.append((start + begin, end - begin, first, count))
+
+        return plan
+
+    def run(self, values: ArrayOrPath, times: Optional[ArrayOrPath] = None, out: Optional[ArrayOrPath] = None,
+            out_times: Optional[ArrayOrPath] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Runs the pipeline.
+        :param values: Array of shape (N, 3) or (N, 4), or the path of a .npy file which is memory-mapped
+        :param times: Sample times in nanoseconds with shape (N,), or the path of a .npy file. Needed for Resample.
+        :param out: Optional path of a .npy file the output values are written to, which avoids holding the
+                    complete output in memory
+        :param out_times: Optional path of a .npy file the resampled output times are written to
+        :return: Tuple of the output values and the output times. The output times are the input times when there is
+                 no Resample stage and None when no times were given.
+        """
+        values = _open_input(values)
+        times = _open_input(times)
+
+        if values.ndim != 2:
+            raise InputDimensionError(f"A pipeline needs an input array of shape (N, M), not {values.shape}")
+        n_rows, input_width = values.shape
+        if times is not None and times.shape != (n_rows,):
+            raise InputDimensionError(f"The times need to have shape ({n_rows},), not {times.shape}")
+        if self._resample is not None and times is None:
+            raise ValueError("A pipeline with a Resample stage needs sample times")
+        if self._resample is not None and n_rows == 0:
+            raise ValueError("A pipeline with a Resample stage needs at least one sample")
+        if self._resample is not None:
+            # Out of order times would make the grid of the plan jump, so they are rejected before planning
+            self._check_times(times)
+
+        output_width = self._output_width(input_width)
+
+        plan = self._plan(times, n_rows)
+        n_out = sum(count for _, _, _, count in plan)
+        output = self._allocate(out, (n_out, output_width), np.float64)
+
+        output_times = times
+        if self._resample is not None:
+            output_times = self._allocate(out_times, (n_out,), np.int64)
+            for _, _, first, count in plan:
+                output_times[first:first + count] = \
+                    int(times[0]) + np.arange(first, first + count, dtype=np.int64) * self._resample.period
+
+        if plan:
+            in_shape = (max(n_in for _, n_in, _, _ in plan), values.shape[1])
+            out_rows = max(count for _, _, _, count in plan)
+            self._execute(plan, values, times, output, in_shape, (out_rows, output_width))
+
+        if isinstance(output, np.memmap):
+            output.flush()
+        if isinstance(output_times, np.memmap) and self._resample is not None:
+            output_times.flush()
+
+        return output, output_times
+
+    @staticmethod
+    def _allocate(path: Optional[ArrayOrPath], shape: Tuple[int, ...], dtype) -> np.ndarray:
+        if path is None:
+            return np.empty(shape, dtype=dtype)
+        if isinstance(path, np.ndarray):
+            if path.shape != shape:
+                raise InputDimensionError(f"The output array needs to have shape {shape}, not {path.shape}")
+            return path
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def _execute(self, plan, values, times, output, in_shape, out_shape):
+        n_slots = min(self.max_chunks_in_flight, len(plan))
+        start_time = int(times[0]) if times is not None else 0
+        needs_times = self._resample is not None
+
+        if self.processes == 0:
+            state = dict(pre=self._pre, resample=self._resample, post=self._post, start_time=start_time)
+            state["in"] = [np.empty(in_shape, dtype=np.float64)]
+            state["times"] = [np.empty(in_shape[:1], dtype=np.int64)]
+            state["out"] = [np.empty(out_shape, dtype=np.float64)]
+            for start, n_in, first, count in plan:
+                self._fill(state["in"][0], state["times"][0] if needs_times else None, values, times, start, n_in)
+                _process_chunk(state, 0, n_in, first, count)
+                output[first:first + count] = state["out"][0][:count]
+            return
+
+        memory = []
+        in_slots, times_slots, out_slots = [], [], []
+
+        def create(shape, dtype):
+            block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+            memory.append(block)
+            return block.name, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+        try:
+            in_slots.extend(create(in_shape, np.float64) for _ in range(n_slots))
+            if needs_times:
+                times_slots.extend(create(in_shape[:1], np.int64) for _ in range(n_slots))
+            out_slots.extend(create(out_shape, np.float64) for _ in range(n_slots))
+
+            init_args = (self._pre, self._resample, self._post, start_time,
+                         [name for name, _ in in_slots], [name for name, _ in times_slots],
+                         [name for name, _ in out_slots], in_shape, out_shape)
+
+            with multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=init_args) as pool:
+                free_slots = deque(range(n_slots))
+                pending = deque()
+
+                for start, n_in, first, count in plan:
+                    if not free_slots:
+                        self._collect(pending, out_slots, output, free_slots)
+
+                    slot = free_slots.popleft()
+                    self._fill(in_slots[slot][1], times_slots[slot][1] if needs_times else None,
+                               values, times, start, n_in)
+                    pending.append((slot, first, count, pool.apply_async(_run_chunk, (slot, n_in, first, count))))
+
+                while pending:
+                    self._collect(pending, out_slots, output, free_slots)
+        finally:
+            # The array views have to be released before the shared memory can be closed
+            in_slots.clear()
+            times_slots.clear()
+            out_slots.clear()
+            for block in memory:
+                block.close()
+                block.unlink()
+
+    @staticmethod
+    def _fill(in_buffer, times_buffer, values, times, start, n_in):
+        in_buffer[:n_in] = values[start:start + n_in]
+        if times_buffer is not None:
+            times_buffer[:n_in] = times[start:start + n_in]
+
+    @staticmethod
+    def _collect(pending, out_slots, output, free_slots):
+        # Chunks are collected in submission order, which keeps the output order deterministic
+        slot, first, count, result = pending.popleft()
+        result.get()
+        output[first:first + count] = out_slots[slot][1][:count]
+        free_slots.append(slot)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import functools
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+DEFAULT_TAG = "untagged"
+
+# Operation name -> (class, attribute name) of the methods that get instrumented
+INSTRUMENTED_OPERATIONS: Dict[str, Tuple[type, str]] = {
+    "Vec3.rotate": (Vec3, "rotate"),
+    "Vec3.rotate_inverse": (Vec3, "rotate_inverse"),
+    "Quaternion.__mul__": (Quaternion, "__mul__"),
+    "Quaternion.to_euler": (Quaternion, "to_euler"),
+    "Quaternion.from_euler": (Quaternion, "from_euler"),
+    "Quaternion.get_rotation_matrix": (Quaternion, "get_rotation_matrix"),
+}
+
+# (operation, tag) -> [call count, accumulated time in nanoseconds]
+_stats: Dict[Tuple[str, str], list] = {}
+_stats_lock = threading.Lock()
+_local = threading.local()
+
+# Operation name -> original class attribute, only filled while profiling is enabled
+_originals: Dict[str, object] = {}
+
+# Guards swapping the methods and the bookkeeping of the profiling() contexts
+_swap_lock = threading.Lock()
+# Number of profiling() contexts that are currently open, in any thread
+_active_contexts = 0
+# Whether the first open profiling() context enabled profiling, in which case the last one to exit disables it again
+_enabled_by_contexts = False
+
+
+def _record(operation: str, elapsed_ns: int):
+    key = (operation, getattr(_local, "tag", DEFAULT_TAG))
+    with _stats_lock:
+        entry = _stats.get(key)
+        if entry is None:
+            _stats[key] = [1, elapsed_ns]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed_ns
+
+
+def _instrument(operation: str, function: Callable) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(operation, perf_counter_ns() - start)
+
+    return wrapper
+
+
+def _enable():
+    if _originals:
+        return
+
+    for operation, (cls, name) in INSTRUMENTED_OPERATIONS.items():
+        original = cls.__dict__[name]
+        _originals[operation] = original
+
+        if isinstance(original, staticmethod):
+            setattr(cls, name, staticmethod(_instrument(operation, original.__func__)))
+        else:
+            setattr(cls, name, _instrument(operation, original))
+
+
+def _disable():
+    for operation, (cls, name) in INSTRUMENTED_OPERATIONS.items():
+        if operation in _originals:
+            setattr(cls, name, _originals.pop(operation))
+
+
+def enable():
+    """
+    Replaces the instrumented methods of Vec3 and Quaternion with versions that count the calls and accumulate the time
+    spent in them. The original methods are untouched while profiling is disabled, so there is no overhead then.
+    """
+    with _swap_lock:
+        _enable()
+
+
+def disable():
+    """
+    Restores the original, uninstrumented methods. The collected statistics are kept until reset() is called.
+    This also disables profiling for profiling() contexts that are still open.
+    """
+    with _swap_lock:
+        _disable()
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def reset():
+    """
+    Clears all collected statistics.
+    """
+    with _stats_lock:
+        _stats.clear()
+
+
+@contextmanager
+def tag(name: str) -> Iterator[None]:
+    """
+    Attributes all instrumented calls made by the current thread within this context to the given caller tag.
+    :param name: Caller tag, for example the name of the control loop
+    """
+    previous = getattr(_local, "tag", DEFAULT_TAG)
+    _local.tag = name
+    try:
+        yield
+    finally:
+        _local.tag = previous
+
+
+@contextmanager
+def profiling(caller_tag: Optional[str] = None) -> Iterator[None]:
+    """
+    Enables profiling within this context. Contexts can be open in several threads at once, profiling stays enabled
+    until the last of them exits. When profiling was already enabled before the first context, it stays enabled.
+    :param caller_tag: Optional caller tag for the calls made within this context
+    """
+    global _active_contexts, _enabled_by_contexts
+
+    with _swap_lock:
+        if _active_contexts == 0:
+            _enabled_by_contexts = not is_enabled()
+        _active_contexts += 1
+        _enable()
+
+    try:
+        if caller_tag is None:
+            yield
+        else:
+            with tag(caller_tag):
+                yield
+    finally:
+        with _swap_lock:
+            _active_contexts -= 1
+            if _active_contexts == 0 and _enabled_by_contexts:
+                _disable()
+
+
+def snapshot() -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    Gives a copy of the collected statistics.
+    Nested calls are counted inclusively, e.g. the time of Vec3.rotate includes the Quaternion.__mul__ calls it makes.
+    :return: Dictionary in the form {operation: {tag: {"calls": int, "total_ns": int}}}
+    """
+    with _stats_lock:
+        items = [(key, tuple(entry)) for key, entry in _stats.items()]
+
+    result: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for (operation, caller_tag), (calls, total_ns) in sorted(items):
+        result.setdefault(operation, {})[caller_tag] = {"calls": calls, "total_ns": total_ns}
+
+    return result
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(prefix: str = "lobster_common") -> str:
+    """
+    Dumps the collected statistics in the Prometheus text exposition format.
+    :param prefix: Prefix of the metric names
+    :return: Text with a calls counter and a time counter (in seconds) per operation and caller tag
+    """
+    calls_lines = [f"# HELP {prefix}_calls_total Number of calls per operation and caller tag.",
+                   f"# TYPE {prefix}_calls_total counter"]
+    time_lines = [f"# HELP {prefix}_seconds_total Time spent per operation and caller tag.",
+                  f"# TYPE {prefix}_seconds_total counter"]
+
+    for operation, tags in snapshot().items():
+        for caller_tag, stats in tags.items():
+            labels = f'operation="{_escape_label(operation)}",tag="{_escape_label(caller_tag)}"'
+            calls_lines.append(f"{prefix}_calls_total{{{labels}}} {stats['calls']}")
+            time_lines.append(f"{prefix}_seconds_total{{{labels}}} {stats['total_ns'] / 1e9:.9f}")
+
+    return "\n".join(calls_lines + time_lines) + "\n"
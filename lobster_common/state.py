@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from lobster_common.quaternion import Quaternion
+from lobster_common.time_units import Nanoseconds, Time
+from lobster_common.vec3 import Vec3
+
+# Packed record of the full vehicle state, all in the NED coordinate system.
+STATE_DTYPE = np.dtype([
+    ("time", np.int64),  # nanoseconds
+    ("position", np.float64, (3,)),
+    ("attitude", np.float64, (4,)),  # quaternion [x, y, z, w]
+    ("velocity", np.float64, (3,)),
+    ("angular_rate", np.float64, (3,)),
+])
+
+
+class State(NamedTuple):
+    """
+    Single vehicle state. The vectors and quaternion are views on the StateArray they came from.
+    """
+    time: Time
+    position: Vec3
+    attitude: Quaternion
+    velocity: Vec3
+    angular_rate: Vec3
+
+
+class StateArray:
+    """
+    Array of vehicle states stored as a single structured numpy array with the STATE_DTYPE.
+    The fields are exposed as plain numpy views, e.g. position has shape (N, 3) and attitude has shape (N, 4).
+    """
+
+    def __init__(self, data: np.ndarray):
+        """
+        Wraps an existing structured array without copying it.
+        :param data: One dimensional array with the STATE_DTYPE, e.g. a memory-mapped .npy file
+        """
+        if data.dtype != STATE_DTYPE:
+            raise TypeError(f"A StateArray needs an array with dtype {STATE_DTYPE}, not {data.dtype}")
+        if data.ndim != 1:
+            raise ValueError(f"A StateArray needs a one dimensional array, not {data.ndim} dimensions")
+
+        self._data: np.ndarray = data
+
+    @staticmethod
+    def zeros(length: int) -> StateArray:
+        """
+        Creates an array of states with all fields set to zero and the attitudes set to the identity rotation.
+        """
+        data = np.zeros(length, dtype=STATE_DTYPE)
+        data["attitude"][:, 3] = 1
+        return StateArray(data)
+
+    @staticmethod
+    def from_arrays(time: np.ndarray, position: np.ndarray, attitude: np.ndarray, velocity: np.ndarray,
+                    angular_rate: np.ndarray) -> StateArray:
+        """
+        Packs separate arrays into a StateArray.
+        :param time: Times in nanoseconds with shape (N,)
+        :param position: Positions with shape (N, 3)
+        :param attitude: Quaternions with shape (N, 4) in the form [x, y, z, w]
+        :param velocity: Velocities with shape (N, 3)
+        :param angular_rate: Angular rates with shape (N, 3)
+        """
+        data = np.empty(len(time), dtype=STATE_DTYPE)
+        data["time"] = time
+        data["position"] = position
+        data["attitude"] = attitude
+        data["velocity"] = velocity
+        data["angular_rate"] = angular_rate
+        return StateArray(data)
+
+    @staticmethod
+    def concatenate(arrays: Sequence[StateArray]) -> StateArray:
+        return StateArray(np.concatenate([array.numpy() for array in arrays]))
+
+    @staticmethod
+    def load(path: Union[str, os.PathLike], mmap_mode: Optional[str] = None) -> StateArray:
+        """
+        Loads states from a .npy file.
+        :param path: Path of the .npy file
+        :param mmap_mode: Memory-map the file instead of reading it, see numpy.load
+        """
+        return StateArray(np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path: Union[str, os.PathLike]):
+        """
+        Saves the states to a .npy file, which can be memory-mapped again without conversion.
+        """
+        np.save(path, self._data)
+
+    def numpy(self) -> np.ndarray:
+        return self._data
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._data["time"]
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._data["position"]
+
+    @property
+    def attitude(self) -> np.ndarray:
+        return self._data["attitude"]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._data["velocity"]
+
+    @property
+    def angular_rate(self) -> np.ndarray:
+        return self._data["angular_rate"]
+
+    def sorted_by_time(self) -> StateArray:
+        """
+        Gives a copy of the states sorted by time. States with the same time keep their order.
+        """
+        return StateArray(self._data[np.argsort(self._data["time"], kind="stable")])
+
+    def between(self, start: int, end: int) -> StateArray:
+        """
+        Gives the states with a time in the range [start, end).
+        :param start: Start time in nanoseconds
+        :param end: End time in nanoseconds
+        """
+        return self[(self.time >= start) & (self.time < end)]
+
+    def __len__(self):
+        return self._data.shape[0]
+
+    def __getitem__(self, key) -> Union[State, StateArray]:
+        """
+        An integer index gives a single State, any other index (slice, boolean mask, index array) gives a StateArray.
+        """
+        if isinstance(key, (int, np.integer)):
+            record = self._data[key]
+            return State(Nanoseconds(int(record["time"])), Vec3(record["position"]), Quaternion(record["attitude"]),
+                         Vec3(record["velocity"]), Vec3(record["angular_rate"]))
+
+        return StateArray(self._data[key])
+
+    def __setitem__(self, key, value: Union[State, StateArray]):
+        if isinstance(value, StateArray):
+            self._data[key] = value.numpy()
+        else:
+            self._data[key] = (int(value.time), value.position.numpy(), value.attitude.numpy(),
+                               value.velocity.numpy(), value.angular_rate.numpy())
+
+    def __eq__(self, other: StateArray):
+        if isinstance(other, StateArray):
+            return np.array_equal(self._data, other._data)
+
+        return False
+
+    def __str__(self):
+        return f"StateArray<{len(self)} states>"
+
+    def __repr__(self):
+        return str(self)
@@ -0,0 +1,116 @@
+import math
+import unittest
+
+import numpy as np
+
+from lobster_common import batch
+from lobster_common.exceptions import InputDimensionError
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_rotate_vectors(self):
+        np.random.seed(0)
+        vectors = np.random.rand(50, 3)
+        q = Quaternion.from_euler(Vec3(np.random.rand(3) * 2 * math.pi))
+
+        rotated = batch.rotate_vectors(vectors, q)
+        rotated_inverse = batch.rotate_vectors(vectors, q, inverse=True)
+
+        for i in range(vectors.shape[0]):
+            np.testing.assert_allclose(rotated[i], Vec3(vectors[i]).rotate(q).numpy())
+            np.testing.assert_allclose(rotated_inverse[i], Vec3(vectors[i]).rotate_inverse(q).numpy())
+
+    def test_euler_conversion(self):
+        np.random.seed(0)
+        eulers = np.random.rand(50, 3) * 4 * math.pi - 2 * math.pi
+        quaternions = batch.euler_to_quaternions(eulers)
+        back = batch.quaternions_to_euler(quaternions)
+
+        for i in range(eulers.shape[0]):
+            q = Quaternion.from_euler(Vec3(eulers[i]))
+            np.testing.assert_allclose(quaternions[i], q.numpy())
+            np.testing.assert_allclose(back[i], q.to_euler().numpy(), atol=1e-12)
+
+    def test_convert_ned_nwu(self):
+        np.random.seed(0)
+        quaternions = np.random.rand(10, 4)
+
+        converted = batch.convert_ned_nwu(quaternions)
+
+        for i in range(quaternions.shape[0]):
+            np.testing.assert_array_equal(converted[i], Quaternion(quaternions[i]).as_nwu())
+
+    def test_resample(self):
+        times = np.array([0, 10, 20], dtype=np.int64)
+        values = np.array([[0.0, 0.0], [1.0, 10.0], [3.0, 10.0]])
+
+        result = batch.resample(times, values, np.array([0, 5, 15, 20]))
+
+        np.testing.assert_allclose(result, [[0, 0], [0.5, 5], [2, 10], [3, 10]])
+
+    def test_resample_quaternion_shortest_path(self):
+        q = Quaternion.from_euler(Vec3([0.2, 0, 0])).numpy()
+        times = np.array([0, 10], dtype=np.int64)
+
+        # -q is the same rotation, so the interpolation has to stay at that rotation
+        result = batch.resample(times, np.array([q, -q]), np.array([5]), quaternion=True)
+
+        np.testing.assert_allclose(result[0], q)
+
+    def test_wrong_dimension(self):
+        with self.assertRaises(InputDimensionError):
+            batch.quaternions_to_euler(np.zeros((5, 3)))
+
+
+class ComparisonTest(unittest.TestCase):
+
+    def test_compare_vectors(self):
+        a = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]])
+        b = a.copy()
+        b[2, 0] += 0.1
+
+        report = batch.compare_vectors(a, b, tolerance=1e-3)
+
+        np.testing.assert_array_equal(report.mask, [True, True, False])
+        self.assertAlmostEqual(report.max_error, 0.1)
+        self.assertEqual(report.max_error_index, 2)
+        self.assertFalse(report.all_close)
+
+        self.assertTrue(batch.compare_vectors(a[:1], Vec3([1.0, 2.0, 3.0])).all_close)
+
+    def test_compare_quaternions_sign(self):
+        np.random.seed(0)
+        quaternions = batch.euler_to_quaternions(np.random.rand(100, 3) * 2 * math.pi)
+
+        report = batch.compare_quaternions(quaternions, -quaternions)
+
+        self.assertTrue(report.all_close)
+        self.assertLess(report.max_error, 1e-7)
+
+    def test_quaternion_angles(self):
+        angles = np.array([1e-9, 0.1, 1.0, math.pi])
+        rotations = batch.euler_to_quaternions(np.stack([angles, np.zeros(4), np.zeros(4)], axis=1))
+
+        result = batch.quaternion_angles(rotations, Quaternion([0.0, 0.0, 0.0, 1.0]))
+
+        np.testing.assert_allclose(result, angles, rtol=1e-9)
+
+        report = batch.compare_quaternions(rotations, Quaternion([0.0, 0.0, 0.0, 1.0]), angle_tolerance=0.01)
+        np.testing.assert_array_equal(report.mask, [True, False, False, False])
+        self.assertEqual(report.max_error_index, 3)
+
+    def test_zero_norm_quaternion(self):
+        quaternions = np.array([[0.0, 0.0, 0.0, 1.0], [0.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0]])
+
+        with self.assertRaisesRegex(ZeroDivisionError, r"\[1\]"):
+            batch.compare_quaternions(quaternions, Quaternion([0.0, 0.0, 0.0, 1.0]))
+
+    def test_mismatched_rows(self):
+        with self.assertRaises(InputDimensionError):
+            batch.compare_vectors(np.zeros((3, 3)), np.zeros((2, 3)))
+
+        with self.assertRaises(InputDimensionError):
+            batch.quaternion_angles(np.ones((3, 4)), np.ones((2, 4)))
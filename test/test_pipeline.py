@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from lobster_common import batch
+from lobster_common.exceptions import InputDimensionError
+from lobster_common.pipeline import Pipeline, Stage, Rotate, ConvertNedNwu, QuaternionToEuler, EulerToQuaternion, \
+    Resample
+from lobster_common.quaternion import Quaternion
+from lobster_common.time_units import Milliseconds
+from lobster_common.vec3 import Vec3
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.q = Quaternion.from_euler(Vec3(np.random.rand(3)))
+
+    def test_serial_and_parallel_are_equal(self):
+        vectors = np.random.rand(1000, 3)
+        stages = [Rotate(self.q), ConvertNedNwu()]
+
+        serial, _ = Pipeline(stages, chunk_size=64, processes=0).run(vectors)
+        parallel, _ = Pipeline(stages, chunk_size=64, processes=2, max_chunks_in_flight=3).run(vectors)
+
+        np.testing.assert_array_equal(serial, parallel)
+        np.testing.assert_allclose(serial, batch.convert_ned_nwu(batch.rotate_vectors(vectors, self.q)))
+
+    def test_euler_round_trip(self):
+        eulers = np.random.rand(500, 3)
+
+        result, _ = Pipeline([EulerToQuaternion(), QuaternionToEuler()], chunk_size=100, processes=2).run(eulers)
+
+        np.testing.assert_allclose(result, eulers)
+
+    def test_resample(self):
+        times = np.cumsum(np.random.randint(1, 5_000_000, size=1000)).astype(np.int64) + 10 ** 18
+        values = np.random.rand(1000, 3)
+        stages = [Resample(Milliseconds(1)), Rotate(self.q)]
+
+        result, result_times = Pipeline(stages, chunk_size=97, processes=2).run(values, times)
+
+        expected_times = np.arange(times[0], times[-1] + 1, int(Milliseconds(1)), dtype=np.int64)
+        np.testing.assert_array_equal(result_times, expected_times)
+        np.testing.assert_allclose(
+            result, batch.rotate_vectors(batch.resample(times, values, expected_times), self.q))
+
+    def test_memory_mapped_files(self):
+        values = np.random.rand(300, 4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input.npy")
+            output_path = os.path.join(directory, "output.npy")
+            np.save(input_path, values)
+
+            Pipeline([QuaternionToEuler()], chunk_size=50, processes=2).run(input_path, out=output_path)
+
+            np.testing.assert_allclose(np.load(output_path), batch.quaternions_to_euler(values))
+
+    def test_invalid_pipelines(self):
+        with self.assertRaises(ValueError):
+            Pipeline([Resample(10), Resample(10)])
+
+        with self.assertRaises(InputDimensionError):
+            Pipeline([QuaternionToEuler(), QuaternionToEuler()], processes=0).run(np.zeros((10, 4)))
+
+        with self.assertRaises(ValueError):
+            Pipeline([Resample(10)], processes=0).run(np.zeros((10, 3)))
+
+    def test_resample_output_is_chunked(self):
+        # A gap of 10 seconds at a period of 1 ms gives 10000 grid points between two samples
+        times = np.concatenate([np.arange(10), np.arange(10) + 10_000]).astype(np.int64) * int(Milliseconds(1))
+        values = np.random.rand(20, 3)
+        pipeline = Pipeline([Resample(Milliseconds(1))], chunk_size=8, processes=2)
+
+        plan = pipeline._plan(times, times.shape[0])
+        self.assertLessEqual(max(count for _, _, _, count in plan), 8)
+
+        result, result_times = pipeline.run(values, times)
+
+        np.testing.assert_array_equal(result_times, np.arange(10_010, dtype=np.int64) * int(Milliseconds(1)))
+        np.testing.assert_allclose(result, batch.resample(times, values, result_times))
+
+    def test_incomplete_stage(self):
+        class Incomplete(Stage):
+            def output_width(self, input_width: int) -> int:
+                return input_width
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_decreasing_times(self):
+        # The decrease is between the last sample of the first chunk and the first sample of the second chunk
+        times = np.array([0, 1, 10 ** 10, 2], dtype=np.int64)
+
+        with self.assertRaises(ValueError):
+            Pipeline([Resample(1)], chunk_size=3, processes=0).run(np.zeros((4, 3)), times)
+
+        with self.assertRaises(ValueError):
+            Pipeline([Resample(1)], chunk_size=2, processes=0).run(np.zeros((4, 3)), times)
+
+    def test_resample_tasks_only_use_needed_rows(self):
+        # Upsampling by a factor of 10 splits every chunk of 10 samples into 10 tasks
+        times = np.arange(100, dtype=np.int64) * 10
+        values = np.random.rand(100, 3)
+        pipeline = Pipeline([Resample(1)], chunk_size=10, processes=0)
+
+        plan = pipeline._plan(times, times.shape[0])
+
+        self.assertLessEqual(max(n_in for _, n_in, _, _ in plan), 3)
+        self.assertEqual(sum(n_in for _, n_in, _, _ in plan), 2 * len(plan))
+
+        result, result_times = pipeline.run(values, times)
+        np.testing.assert_allclose(result, batch.resample(times, values, result_times))
@@ -0,0 +1,125 @@
+import threading
+import unittest
+
+import numpy as np
+
+from lobster_common import profiling
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        profiling.disable()
+        profiling.reset()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+
+    def test_disabled_has_original_methods(self):
+        original_rotate = Vec3.rotate
+        original_from_euler = Quaternion.__dict__["from_euler"]
+
+        profiling.enable()
+        self.assertIsNot(Vec3.rotate, original_rotate)
+
+        profiling.disable()
+        self.assertIs(Vec3.rotate, original_rotate)
+        self.assertIs(Quaternion.__dict__["from_euler"], original_from_euler)
+
+        Vec3([1, 2, 3]).rotate(Quaternion([0, 0, 0, 1]))
+        self.assertEqual(profiling.snapshot(), {})
+
+    def test_counts_per_tag(self):
+        q = Quaternion.from_euler(Vec3([0.1, 0.2, 0.3]))
+        vec = Vec3([1.0, 2.0, 3.0])
+
+        with profiling.profiling():
+            vec.rotate(q)
+            with profiling.tag("control"):
+                vec.rotate(q)
+                vec.rotate(q)
+                q.to_euler()
+
+        self.assertFalse(profiling.is_enabled())
+
+        stats = profiling.snapshot()
+        self.assertEqual(stats["Vec3.rotate"][profiling.DEFAULT_TAG]["calls"], 1)
+        self.assertEqual(stats["Vec3.rotate"]["control"]["calls"], 2)
+        self.assertEqual(stats["Quaternion.to_euler"]["control"]["calls"], 1)
+        # Every rotation consists of two quaternion multiplications
+        self.assertEqual(stats["Quaternion.__mul__"]["control"]["calls"], 4)
+        self.assertGreater(stats["Vec3.rotate"]["control"]["total_ns"], 0)
+
+    def test_results_unchanged(self):
+        np.random.seed(0)
+        q = Quaternion.from_euler(Vec3(np.random.rand(3)))
+        vec = Vec3(np.random.rand(3))
+
+        expected = vec.rotate(q)
+        with profiling.profiling("test"):
+            self.assertEqual(vec.rotate(q), expected)
+            self.assertTrue(Quaternion.from_euler(Vec3([0.1, 0.2, 0.3])).almost_equal(
+                Quaternion.from_euler(Vec3([0.1, 0.2, 0.3]))))
+
+        self.assertEqual(profiling.snapshot()["Quaternion.from_euler"]["test"]["calls"], 2)
+
+    def test_prometheus_text(self):
+        with profiling.profiling("loop"):
+            Quaternion([0, 0, 0, 1]).get_rotation_matrix()
+
+        text = profiling.prometheus_text()
+        self.assertIn('lobster_common_calls_total{operation="Quaternion.get_rotation_matrix",tag="loop"} 1', text)
+        self.assertIn("# TYPE lobster_common_seconds_total counter", text)
+
+    def test_overlapping_contexts_in_threads(self):
+        q = Quaternion([0.0, 0.0, 0.0, 1.0])
+        a_entered = threading.Event()
+        a_exited = threading.Event()
+        b_done = threading.Event()
+
+        def thread_a():
+            with profiling.profiling("a"):
+                a_entered.set()
+                q.to_euler()
+            a_exited.set()
+
+        def thread_b():
+            a_entered.wait()
+            with profiling.profiling("b"):
+                a_exited.wait()
+                # Thread a has left its context, but this one is still open
+                self.assertTrue(profiling.is_enabled())
+                q.to_euler()
+            b_done.set()
+
+        threads = [threading.Thread(target=thread_a), threading.Thread(target=thread_b)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(b_done.is_set())
+        self.assertFalse(profiling.is_enabled())
+        stats = profiling.snapshot()["Quaternion.to_euler"]
+        self.assertEqual(stats["a"]["calls"], 1)
+        self.assertEqual(stats["b"]["calls"], 1)
+
+    def test_concurrent_enable(self):
+        original_rotate = Vec3.rotate
+        barrier = threading.Barrier(8)
+
+        def toggle():
+            barrier.wait()
+            profiling.enable()
+
+        threads = [threading.Thread(target=toggle) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        profiling.disable()
+        self.assertIs(Vec3.rotate, original_rotate)
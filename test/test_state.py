@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from lobster_common.quaternion import Quaternion
+from lobster_common.state import StateArray, STATE_DTYPE
+from lobster_common.time_units import Seconds
+from lobster_common.vec3 import Vec3
+
+
+def random_states(length: int) -> StateArray:
+    return StateArray.from_arrays(np.random.randint(0, 10 ** 12, size=length), np.random.rand(length, 3),
+                                  np.random.rand(length, 4), np.random.rand(length, 3), np.random.rand(length, 3))
+
+
+class StateArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+
+    def test_packed_dtype(self):
+        self.assertEqual(STATE_DTYPE.itemsize, 8 + 8 * (3 + 4 + 3 + 3))
+
+    def test_field_views(self):
+        states = StateArray.zeros(10)
+        states.position[3] = [1, 2, 3]
+
+        self.assertEqual(states.position.shape, (10, 3))
+        self.assertEqual(states.attitude.shape, (10, 4))
+        self.assertEqual(states[3].position, Vec3([1.0, 2.0, 3.0]))
+        self.assertEqual(states[0].attitude, Quaternion([0.0, 0.0, 0.0, 1.0]))
+
+    def test_single_state(self):
+        states = StateArray.zeros(2)
+        states[1] = states[1]._replace(time=Seconds(2), velocity=Vec3([4.0, 5.0, 6.0]))
+
+        self.assertEqual(states[1].time.seconds, 2)
+        np.testing.assert_array_equal(states.velocity[1], [4, 5, 6])
+
+    def test_sort_mask_and_concatenate(self):
+        states = random_states(100)
+
+        sorted_states = states.sorted_by_time()
+        self.assertTrue(np.all(np.diff(sorted_states.time) >= 0))
+
+        mask = states.position[:, 0] > 0.5
+        self.assertEqual(len(states[mask]), np.count_nonzero(mask))
+
+        combined = StateArray.concatenate([states[:40], states[40:]])
+        self.assertEqual(combined, states)
+
+        selected = states.between(0, 10 ** 11)
+        self.assertTrue(np.all(selected.time < 10 ** 11))
+
+    def test_save_and_memory_map(self):
+        states = random_states(50)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "states.npy")
+            states.save(path)
+
+            loaded = StateArray.load(path, mmap_mode="r")
+
+            self.assertIsInstance(loaded.numpy(), np.memmap)
+            self.assertEqual(loaded, states)
+            del loaded
+
+    def test_wrong_dtype(self):
+        with self.assertRaises(TypeError):
+            StateArray(np.zeros(10))